@@ -1,5 +1,7 @@
+import argparse
+import socket
 import time
-import pandas as pd
+import xmlrpc.client
 from browsermobproxy import Server
 from selenium import webdriver
 from selenium.webdriver.chrome.service import Service
@@ -7,73 +9,195 @@ from selenium.webdriver.chrome.options import Options
 import json
 import os
 
+from crawl_coordinator import load_urls
+from crawl_metrics import METRICS_FILE, PROFILE_MODE, Metrics, profiled
+
 # Paths (update these paths)
 browsermob_proxy_path = (
     "browsermob-proxy/bin/browsermob-proxy"  # Path to BrowserMob Proxy binary
 )
 # chromedriver_path = "/path/to/chromedriver"  # Path to ChromeDriver
 
-# Load the list of URLs from a CSV
 csv_file = "top-1m.csv"  # Your CSV file with URLs
-urls_df = pd.read_csv(csv_file, usecols=[1])  # Assuming URLs are in the second column
-urls = urls_df.iloc[:, 0].tolist()
-urls = [
-    url if url.startswith("http") else f"http://{url}" for url in urls
-]  # Ensure URLs start with http/https
 
-# Create a directory to save HAR files
+# Directory to save HAR files
 output_dir = "har_files"
-os.makedirs(output_dir, exist_ok=True)
-
-# Start the BrowserMob Proxy server
-server = Server(browsermob_proxy_path)
-server.start()
-proxy = server.create_proxy(params=dict(trustAllServers=True))
-
-# Set up Selenium WebDriver with the proxy
-chrome_options = Options()
-chrome_options.add_argument(f"--proxy-server={proxy.proxy}")
-chrome_options.add_argument("--ignore-certificate-errors")
-chrome_options.add_argument("--headless") 
-chrome_options.add_argument("--disable-gpu")
-chrome_options.add_argument("--no-sandbox")
-driver = webdriver.Chrome(options=chrome_options)
-driver.set_page_load_timeout(10)
-# driver = webdriver.Chrome(service=Service(chromedriver_path), options=chrome_options)
-
-# Crawl websites and capture HTTP traffic
-for count, url in enumerate(urls[461:]):  # Limit to first 5 URLs for demonstration
-    try:
-        print(f"Crawling: {url}")
-        # Start capturing a new HAR for each URL
-        proxy.new_har(
-            f"myhar{count}",
-            options={
-                "captureHeaders": True,
-                "captureContent": True,
-                "captureCookies": True,
-            },
-        )
+
+
+def start_proxy_and_driver():
+    """
+    Start the BrowserMob Proxy server and a headless Chrome driver that uses it.
+    """
+    server = Server(browsermob_proxy_path)
+    server.start()
+    proxy = server.create_proxy(params=dict(trustAllServers=True))
+
+    # Set up Selenium WebDriver with the proxy
+    chrome_options = Options()
+    chrome_options.add_argument(f"--proxy-server={proxy.proxy}")
+    chrome_options.add_argument("--ignore-certificate-errors")
+    chrome_options.add_argument("--headless")
+    chrome_options.add_argument("--disable-gpu")
+    chrome_options.add_argument("--no-sandbox")
+    driver = webdriver.Chrome(options=chrome_options)
+    driver.set_page_load_timeout(10)
+    # driver = webdriver.Chrome(service=Service(chromedriver_path), options=chrome_options)
+    return server, proxy, driver
+
+
+def crawl_url(proxy, driver, url, count, metrics):
+    """
+    Load a URL through the proxy and save the captured HAR. Returns the HAR path.
+    """
+    # Start capturing a new HAR for each URL
+    proxy.new_har(
+        f"myhar{count}",
+        options={
+            "captureHeaders": True,
+            "captureContent": True,
+            "captureCookies": True,
+        },
+    )
+    with metrics.timer("driver_get"):
         driver.get(url)  # Navigate to the URL
-        # time.sleep(5)  # Wait for the page to load
+    # time.sleep(5)  # Wait for the page to load
 
-        # Save the HAR file
+    # Save the HAR file
+    with metrics.timer("proxy_har"):
         har_data = proxy.har  # Get HAR data
-        sanitized_url = (
-            url.replace("https://", "").replace("http://", "").replace("/", "_")
-        )
-        har_file_path = os.path.join(output_dir, f"{sanitized_url}.har")
+    sanitized_url = (
+        url.replace("https://", "").replace("http://", "").replace("/", "_")
+    )
+    har_file_path = os.path.join(output_dir, f"{sanitized_url}.har")
+    with metrics.timer("write"):
         with open(har_file_path, "w") as har_file:
             json.dump(har_data, har_file)
-        print(f"Saved HAR for {url} to {har_file_path}")
-    except Exception as e:
-        print(f"Error crawling {url}: {e}")
-    # time.sleep(1)  # Delay between requests
-
-# Clean up
-driver.quit()
-server.stop()
-print("Crawling complete.")
+    metrics.increment("har_bytes", os.path.getsize(har_file_path))
+    return har_file_path
+
+
+def record_progress(metrics):
+    """
+    Print and save the aggregate progress every few seconds.
+    """
+    if metrics.maybe_flush():
+        print(f"Progress: {metrics.summary()}")
+
+
+def crawl_urls(proxy, driver, urls, metrics, start=0):
+    """
+    Crawl a fixed slice of URLs on this machine.
+    """
+    for count, url in enumerate(urls, start):
+        try:
+            print(f"Crawling: {url}")
+            har_file_path = crawl_url(proxy, driver, url, count, metrics)
+            print(f"Saved HAR for {url} to {har_file_path}")
+        except Exception as e:
+            print(f"Error crawling {url}: {e}")
+            metrics.increment("errors")
+        metrics.increment("pages")
+        record_progress(metrics)
+        # time.sleep(1)  # Delay between requests
+
+
+def refresh_queue_progress(metrics, coordinator, baseline, finished):
+    """
+    Track progress through the whole coordinator queue rather than this worker's
+    pages, so the ETA reflects every worker. Counts are relative to `baseline`,
+    the URLs already finished when this worker started, so they do not inflate
+    the rate. `finished` is the count from the previous refresh; returns the new one.
+    """
+    status = coordinator.status()
+    now_finished = status["done"] + status["failed"] - baseline
+    metrics.total = now_finished + status["pending"] + status["leased"]
+    metrics.increment("finished", now_finished - finished)
+    return now_finished
+
+
+def run_worker(proxy, driver, metrics, coordinator_url, worker_id, batch_size=5,
+               poll_interval=5):
+    """
+    Crawl URLs leased from a crawl_coordinator.py server until the queue is drained.
+    `metrics` should use "finished" as its progress counter.
+    """
+    coordinator = xmlrpc.client.ServerProxy(coordinator_url, allow_none=True)
+    status = coordinator.status()
+    baseline = status["done"] + status["failed"]
+    finished = refresh_queue_progress(metrics, coordinator, baseline, 0)
+    while True:
+        leases = coordinator.lease(worker_id, batch_size)
+        finished = refresh_queue_progress(metrics, coordinator, baseline, finished)
+        if not leases:
+            # Other workers still hold leases; wait in case they expire
+            if coordinator.is_complete():
+                break
+            time.sleep(poll_interval)
+            continue
+
+        for count, url in leases:
+            try:
+                print(f"Crawling: {url}")
+                har_file_path = crawl_url(proxy, driver, url, count, metrics)
+                coordinator.complete(url, worker_id, har_file_path)
+                print(f"Saved HAR for {url} to {har_file_path}")
+            except Exception as e:
+                print(f"Error crawling {url}: {e}")
+                metrics.increment("errors")
+                coordinator.fail(url, worker_id, str(e))
+            metrics.increment("pages")
+            record_progress(metrics)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Crawl sites and save HAR files.")
+    parser.add_argument("--start", type=int, default=0,
+                        help="Index of the first URL in the CSV to crawl")
+    parser.add_argument("--end", type=int, default=None,
+                        help="Index one past the last URL in the CSV to crawl")
+    parser.add_argument("--coordinator",
+                        help="Coordinator URL (e.g. http://localhost:8765) to lease URLs from")
+    parser.add_argument("--worker-id", default=f"{socket.gethostname()}-{os.getpid()}",
+                        help="Name this worker reports to the coordinator")
+    parser.add_argument("--batch-size", type=int, default=5,
+                        help="Number of URLs to lease from the coordinator at a time")
+    parser.add_argument("--metrics-file", default=METRICS_FILE,
+                        help="Periodically write crawl rates and timings to this JSON file")
+    parser.add_argument("--profile", choices=["cprofile", "sample"], default=PROFILE_MODE,
+                        help="Profile the crawl and save the results next to the metrics")
+    args = parser.parse_args()
+
+    # Create a directory to save HAR files
+    os.makedirs(output_dir, exist_ok=True)
+
+    # A worker reports progress through the shared queue; a slice through its own pages
+    metrics = Metrics(
+        args.metrics_file,
+        progress_counter="finished" if args.coordinator else "pages",
+    )
+    server, proxy, driver = start_proxy_and_driver()
+    try:
+        with profiled(args.profile, "crawl_profile"):
+            if args.coordinator:
+                run_worker(
+                    proxy, driver, metrics, args.coordinator, args.worker_id,
+                    args.batch_size,
+                )
+            else:
+                # Load the list of URLs from a CSV
+                urls = load_urls(csv_file)[args.start:args.end]
+                metrics.total = len(urls)
+                crawl_urls(proxy, driver, urls, metrics, args.start)
+    finally:
+        # Clean up
+        driver.quit()
+        server.stop()
+        metrics.flush()
+    print(f"Crawling complete. {metrics.summary()}")
+
+
+if __name__ == "__main__":
+    main()
 
 
 # import time
@@ -4,13 +4,27 @@ import socket
 import struct
 import time
 
+PUBLIC_DNS_RESOLVERS = ["8.8.8.8", "8.8.4.4"]  # Google's public DNS servers
 
-def build_dns_query(domain_name):
-    # Transaction ID: Random 16-bit identifier
-    transaction_id = b'\xaa\xbb'
 
-    # Flags: Standard query (0x0100)
-    flags = b'\x01\x00'
+def encode_domain_name(domain_name):
+    # Labels must be 1-63 bytes and the name at most 253 (255 with the length
+    # bytes and root label on the wire); a single trailing dot is allowed
+    name = domain_name[:-1] if domain_name.endswith('.') else domain_name
+    labels = [part.encode('utf-8') for part in name.split('.')]
+    if len(name.encode('utf-8')) > 253:
+        raise ValueError(f"name longer than 253 bytes: {domain_name[:64]}...")
+    for label in labels:
+        if not label:
+            raise ValueError(f"empty label in {domain_name!r}")
+        if len(label) > 63:
+            raise ValueError(f"label longer than 63 bytes in {domain_name[:64]!r}")
+    return b''.join(struct.pack('B', len(label)) + label for label in labels) + b'\x00'
+
+
+def build_dns_query(domain_name, recursion_desired=True, transaction_id=b'\xaa\xbb'):
+    # Flags: Standard query (0x0100), or 0x0000 without RD for iterative lookups
+    flags = b'\x01\x00' if recursion_desired else b'\x00\x00'
 
     # Questions, Answer RRs, Authority RRs, Additional RRs
     qdcount = b'\x00\x01'  # One question
@@ -19,13 +33,11 @@ def build_dns_query(domain_name):
     arcount = b'\x00\x00'  # No additional records
 
     # Question Section
-    qname = b''.join(
-        struct.pack('B', len(part)) + part.encode('utf-8') for part in domain_name.split('.')
-    ) + b'\x00'  # End of QNAME
+    qname = encode_domain_name(domain_name)  # Raises ValueError for an invalid name
     qtype = b'\x00\x01'  # Type A
     qclass = b'\x00\x01'  # Class IN
 
-    # Combine all sections
+    # Combine all sections; the 16-bit transaction ID is echoed back in the response
     return transaction_id + flags + qdcount + ancount + nscount + arcount + qname + qtype + qclass
 
 
@@ -58,23 +70,21 @@ def parse_dns_response(data):
     return ip_addresses
 
 
-def measure_rtt(target, query):
+def measure_rtt(target, query, timeout=10, port=53):
     start_time = time.time()
     with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
-        s.settimeout(10)
-        s.sendto(query, (target, 53))
+        s.settimeout(timeout)
+        s.sendto(query, (target, port))
         data, _ = s.recvfrom(512)
     end_time = time.time()
     return data, (end_time - start_time) * 1000  # RTT in milliseconds
 
 
-def dns_client():
-    domain_name = "tmz.com"
-    public_dns_resolvers = ["8.8.8.8", "8.8.4.4"]  # Google's public DNS servers
+def dns_client(domain_name="tmz.com"):
     query = build_dns_query(domain_name)
 
     total_dns_rtt = 0
-    for resolver in public_dns_resolvers:
+    for resolver in PUBLIC_DNS_RESOLVERS:
         try:
             print(f"Querying {resolver}...")
             response, rtt = measure_rtt(resolver, query)
@@ -88,20 +98,26 @@ def dns_client():
     return None, None
 
 
-def http_request(ip_address):
+def http_probe(ip_address, host, timeout=None):
+    # Returns the RTT and the first chunk of the response, without printing
     request = (
         "GET / HTTP/1.1\r\n"
-        f"Host: tmz.com\r\n"
+        f"Host: {host}\r\n"
         "Connection: close\r\n\r\n"
     )
     with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.settimeout(timeout)
         start_time = time.time()
         s.connect((ip_address, 80))
         s.sendall(request.encode())
         response = s.recv(4096)
         end_time = time.time()
 
-    rtt = (end_time - start_time) * 1000  # RTT in milliseconds
+    return (end_time - start_time) * 1000, response  # RTT in milliseconds
+
+
+def http_request(ip_address, host="tmz.com"):
+    rtt, response = http_probe(ip_address, host)
     print(f"RTT to {ip_address}: {rtt:.2f} ms")
     print("HTTP Response Header:")
     print(response.decode().split("\r\n\r\n")[0])
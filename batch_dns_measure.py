@@ -0,0 +1,329 @@
+import argparse
+import csv
+import os
+import struct
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from Part1DNSClient import (
+    PUBLIC_DNS_RESOLVERS,
+    build_dns_query,
+    encode_domain_name,
+    http_probe,
+    measure_rtt,
+    parse_dns_response,
+)
+from iterative_resolver import ROOT_HINTS, IterativeResolver, parse_server_map
+
+# One tab-separated row per domain; IPs are space-separated
+OUTPUT_FIELDS = [
+    "domain",
+    "resolver",
+    "dns_rtt_ms",
+    "ips",
+    "http_ip",
+    "http_rtt_ms",
+    "status_line",
+    "error",
+]
+
+
+def read_domains(csv_file):
+    """
+    Read domains from a CSV such as top-1m.csv (rank,domain) or a plain list.
+    """
+    domains = []
+    with open(csv_file, newline="") as domain_file:
+        for row in csv.reader(domain_file):
+            if not row:
+                continue
+            domain = row[1] if len(row) > 1 else row[0]
+            domain = domain.strip().replace("https://", "").replace("http://", "")
+            domain = domain.split("/", 1)[0]
+            if domain:
+                domains.append(domain)
+    return domains
+
+
+def truncate_partial_row(output_path):
+    """
+    Cut off a row left half-written by a crash, so the next row written after a
+    resume starts on its own line instead of being glued onto it.
+    """
+    with open(output_path, "rb+") as output_file:
+        end = output_file.seek(0, os.SEEK_END)
+        keep = 0
+        position = end
+        while position > 0:
+            start = max(0, position - 65536)
+            output_file.seek(start)
+            newline = output_file.read(position - start).rfind(b"\n")
+            if newline != -1:
+                keep = start + newline + 1
+                break
+            position = start
+        if keep < end:
+            output_file.truncate(keep)
+
+
+def read_finished_domains(output_path, retry_errors=False):
+    """
+    Return the domains already recorded in an output file, so a run can resume.
+    Rows without the full set of columns are ignored. With `retry_errors`, only
+    rows without an error count, so failed domains are measured again.
+    """
+    if not os.path.exists(output_path):
+        return set()
+    finished = set()
+    with open(output_path, newline="") as output_file:
+        for row in csv.DictReader(output_file, delimiter="\t"):
+            if len(row) != len(OUTPUT_FIELDS) or None in row.values():
+                continue
+            if retry_errors and row["error"]:
+                continue
+            finished.add(row["domain"])
+    return finished
+
+
+def resolve(domain, resolvers=PUBLIC_DNS_RESOLVERS, timeout=5):
+    """
+    Resolve a domain, trying each resolver in turn. Returns a result row.
+    """
+    result = {"domain": domain}
+    try:
+        query = build_dns_query(domain)
+    except ValueError as e:  # Empty or over-long label, or an over-long name
+        result["error"] = f"bad domain: {e}"
+        return result
+
+    total_dns_rtt = 0
+    for resolver in resolvers:
+        try:
+            response, rtt = measure_rtt(resolver, query, timeout)
+        except OSError as e:  # Includes socket.timeout
+            result["error"] = f"{resolver}: {str(e) or 'timed out'}"
+            continue
+        total_dns_rtt += rtt
+        result["resolver"] = resolver
+        result["dns_rtt_ms"] = f"{total_dns_rtt:.2f}"
+        try:
+            ip_addresses = parse_dns_response(response)
+        except (IndexError, struct.error):
+            result["error"] = f"{resolver}: malformed response"
+            continue
+        if ip_addresses:
+            result["ips"] = " ".join(ip_addresses)
+            result.pop("error", None)
+            return result
+        result["error"] = "no A records"
+    return result
+
+
+def resolve_iteratively(domain, resolver):
+    """
+    Resolve a domain from the root with a shared IterativeResolver. The resolver
+    column holds the server that gave the final answer, or "cached".
+    """
+    result = {"domain": domain}
+    try:
+        encode_domain_name(domain)
+    except ValueError as e:
+        result["error"] = f"bad domain: {e}"
+        return result
+    ip_addresses, trace = resolver.resolve(domain)
+    if trace:
+        result["resolver"] = trace[-1][1]
+        result["dns_rtt_ms"] = f"{sum(rtt for _, _, rtt in trace):.2f}"
+    elif ip_addresses:  # Answered from the resolver's cache without a query
+        result["resolver"] = "cached"
+        result["dns_rtt_ms"] = "0.00"
+    if ip_addresses:
+        result["ips"] = " ".join(ip_addresses)
+    else:
+        result["error"] = "not resolved"
+    return result
+
+
+def probe(result, timeout=10):
+    """
+    Send an HTTP request to the first resolved IP and add the timing to the row.
+    """
+    ip_address = result["ips"].split()[0]
+    result["http_ip"] = ip_address
+    try:
+        rtt, response = http_probe(ip_address, result["domain"], timeout)
+        result["http_rtt_ms"] = f"{rtt:.2f}"
+        result["status_line"] = response.split(b"\r\n", 1)[0].decode(
+            "utf-8", errors="replace"
+        )
+    except OSError as e:  # Includes socket.timeout
+        result["error"] = f"http: {str(e) or 'timed out'}"
+    return result
+
+
+class BatchMeasurement:
+    """
+    Resolve domains and probe them over HTTP with separate thread pools, so DNS
+    lookups for later domains overlap with HTTP probes for earlier ones. Rows are
+    appended to the output file as soon as each domain finishes.
+    """
+
+    def __init__(self, output_path, resolvers=PUBLIC_DNS_RESOLVERS, dns_workers=32,
+                 http_workers=32, dns_timeout=5, http_timeout=10,
+                 iterative_resolver=None, retry_errors=False):
+        self.output_path = output_path
+        self.retry_errors = retry_errors
+        self.resolvers = resolvers
+        # When set, domains are resolved from the root instead of via `resolvers`
+        self.iterative_resolver = iterative_resolver
+        self.dns_timeout = dns_timeout
+        self.http_timeout = http_timeout
+        self.dns_pool = ThreadPoolExecutor(max_workers=dns_workers)
+        self.http_pool = ThreadPoolExecutor(max_workers=http_workers)
+        # Bound the number of domains in flight so a 1M-line list is not
+        # turned into 1M queued futures up front
+        self.max_in_flight = 2 * (dns_workers + http_workers)
+        self.in_flight = threading.BoundedSemaphore(self.max_in_flight)
+        self.write_lock = threading.Lock()
+        self.write_error = None  # Set when a row cannot be written; stops the run
+        self.completed = 0
+
+    def run(self, domains):
+        if os.path.exists(self.output_path):
+            truncate_partial_row(self.output_path)
+        finished = read_finished_domains(self.output_path, self.retry_errors)
+        pending = [domain for domain in domains if domain not in finished]
+        print(f"Measuring {len(pending)} domains ({len(finished)} already done)")
+
+        write_header = not os.path.exists(self.output_path) or not os.path.getsize(
+            self.output_path
+        )
+        with open(self.output_path, "a", newline="") as output_file:
+            self.writer = csv.DictWriter(
+                output_file, fieldnames=OUTPUT_FIELDS, delimiter="\t"
+            )
+            self.output_file = output_file
+            if write_header:
+                self.writer.writeheader()
+
+            for domain in pending:
+                self.in_flight.acquire()
+                if self.write_error is not None:
+                    self.in_flight.release()
+                    break
+                if self.iterative_resolver:
+                    future = self.dns_pool.submit(
+                        resolve_iteratively, domain, self.iterative_resolver
+                    )
+                else:
+                    future = self.dns_pool.submit(
+                        resolve, domain, self.resolvers, self.dns_timeout
+                    )
+                future.add_done_callback(partial(self._resolved, domain))
+
+            # Wait for every in-flight domain to be written
+            for _ in range(self.max_in_flight):
+                self.in_flight.acquire()
+        self.dns_pool.shutdown()
+        self.http_pool.shutdown()
+        print(f"Measured {self.completed} domains; results in {self.output_path}")
+        if self.write_error is not None:
+            raise self.write_error
+
+    def _resolved(self, domain, future):
+        try:
+            result = future.result()
+        except Exception as e:
+            result = {"domain": domain, "error": f"dns: {e}"}
+        if result.get("ips") and self.write_error is None:
+            try:
+                future = self.http_pool.submit(probe, result, self.http_timeout)
+            except RuntimeError as e:  # The pool is shutting down
+                result["error"] = f"http: {e}"
+            else:
+                future.add_done_callback(partial(self._probed, result))
+                return
+        self._write(result)
+
+    def _probed(self, result, future):
+        try:
+            result = future.result()
+        except Exception as e:
+            result["error"] = f"http: {e}"
+        self._write(result)
+
+    def _write(self, result):
+        # Every domain passes through here exactly once, which frees its slot. The
+        # slot is freed even if the write fails, or run() would wait forever; the
+        # first error is kept so run() can stop and raise it.
+        try:
+            with self.write_lock:
+                if self.write_error is None:
+                    try:
+                        self.writer.writerow(result)
+                        self.output_file.flush()
+                        self.completed += 1
+                    except Exception as e:  # e.g. the disk is full
+                        self.write_error = e
+        finally:
+            self.in_flight.release()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Measure DNS resolution and HTTP RTT for a list of domains."
+    )
+    parser.add_argument("domains", help="CSV of domains, e.g. top-1m.csv")
+    parser.add_argument("-o", "--output", default="dns_http_measurements.tsv",
+                        help="Results file; existing rows are skipped on restart")
+    parser.add_argument("--retry-errors", action="store_true",
+                        help="On restart, measure again domains whose rows have an error "
+                             "(the new row is appended after the old one)")
+    parser.add_argument("--start", type=int, default=0,
+                        help="Index of the first domain in the list to measure")
+    parser.add_argument("--end", type=int, default=None,
+                        help="Index one past the last domain in the list to measure")
+    parser.add_argument("--resolver", action="append", dest="resolvers",
+                        help="Resolver to query (repeatable; default: Google public DNS)")
+    parser.add_argument("--iterative", action="store_true",
+                        help="Resolve from the root servers instead of a recursive resolver")
+    parser.add_argument("--root", action="append", dest="root_hints",
+                        help="Root server IP for --iterative (repeatable)")
+    parser.add_argument("--dns-port", type=int, default=53,
+                        help="Port of the servers queried by --iterative")
+    parser.add_argument("--map", action="append", dest="server_map",
+                        help="For --iterative, send queries for a server IP elsewhere, "
+                             "as IP=HOST:PORT (repeatable)")
+    parser.add_argument("--dns-workers", type=int, default=32)
+    parser.add_argument("--http-workers", type=int, default=32)
+    parser.add_argument("--dns-timeout", type=float, default=5)
+    parser.add_argument("--http-timeout", type=float, default=10)
+    args = parser.parse_args()
+
+    domains = read_domains(args.domains)[args.start:args.end]
+    iterative_resolver = None
+    if args.iterative:
+        iterative_resolver = IterativeResolver(
+            args.root_hints or ROOT_HINTS, args.dns_port, args.dns_timeout,
+            parse_server_map(args.server_map),
+        )
+    measurement = BatchMeasurement(
+        args.output,
+        args.resolvers or PUBLIC_DNS_RESOLVERS,
+        args.dns_workers,
+        args.http_workers,
+        args.dns_timeout,
+        args.http_timeout,
+        iterative_resolver,
+        args.retry_errors,
+    )
+    try:
+        measurement.run(domains)
+    except OSError as e:
+        sys.exit(f"Stopped: could not write to {args.output}: {e}")
+
+
+if __name__ == "__main__":
+    main()
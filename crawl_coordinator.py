@@ -0,0 +1,221 @@
+import argparse
+import os
+import sqlite3
+import time
+from xmlrpc.server import SimpleXMLRPCServer
+
+import pandas as pd
+
+# Defaults for the coordinator (override on the command line)
+DEFAULT_DB_PATH = "crawl_queue.db"
+DEFAULT_HOST = "localhost"
+DEFAULT_PORT = 8765
+DEFAULT_LEASE_SECONDS = 300  # How long a worker may hold a URL before it is reassigned
+DEFAULT_MAX_ATTEMPTS = 3  # Give up on a URL after this many failed or expired leases
+
+
+def load_urls(csv_file):
+    """
+    Load the list of URLs from the top sites CSV (URLs are in the second column).
+    """
+    urls_df = pd.read_csv(csv_file, usecols=[1])
+    urls = urls_df.iloc[:, 0].tolist()
+    # Ensure URLs start with http/https
+    return [url if url.startswith("http") else f"http://{url}" for url in urls]
+
+
+class LeaseQueue:
+    """
+    SQLite-backed work queue that hands out URLs to crawl workers under a lease.
+
+    A leased URL that is neither completed nor failed before its lease expires
+    becomes available again, so a stalled or dead worker never blocks the crawl.
+    """
+
+    def __init__(self, db_path, lease_seconds=DEFAULT_LEASE_SECONDS,
+                 max_attempts=DEFAULT_MAX_ATTEMPTS):
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.conn = sqlite3.connect(db_path, isolation_level=None)
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS urls (
+                url TEXT PRIMARY KEY,
+                position INTEGER NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                worker TEXT,
+                lease_expires REAL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                har_path TEXT,
+                error TEXT
+            )
+            """
+        )
+        self.conn.execute(
+            "CREATE INDEX IF NOT EXISTS urls_status ON urls (status, position)"
+        )
+
+    def add_urls(self, urls, start=0):
+        """
+        Queue URLs for crawling. URLs that are already queued are left untouched,
+        so re-running the coordinator on the same database resumes the crawl.
+        """
+        with self.conn:
+            self.conn.execute("BEGIN")
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO urls (url, position) VALUES (?, ?)",
+                ((url, start + i) for i, url in enumerate(urls)),
+            )
+
+    def lease(self, worker_id, count=1):
+        """
+        Lease up to `count` URLs to a worker. Pending URLs are handed out first,
+        then URLs whose lease has expired. Returns a list of [position, url].
+        """
+        now = time.time()
+        with self.conn:
+            self.conn.execute("BEGIN IMMEDIATE")
+            # Expired leases that have used up their attempts are given up on
+            self.conn.execute(
+                """
+                UPDATE urls SET status = 'failed', error = 'lease expired'
+                WHERE status = 'leased' AND lease_expires < ? AND attempts >= ?
+                """,
+                (now, self.max_attempts),
+            )
+            rows = self.conn.execute(
+                """
+                SELECT url, position FROM urls
+                WHERE status = 'pending' OR (status = 'leased' AND lease_expires < ?)
+                ORDER BY status = 'leased', position
+                LIMIT ?
+                """,
+                (now, count),
+            ).fetchall()
+            self.conn.executemany(
+                """
+                UPDATE urls SET status = 'leased', worker = ?, lease_expires = ?,
+                                attempts = attempts + 1
+                WHERE url = ?
+                """,
+                ((worker_id, now + self.lease_seconds, url) for url, _ in rows),
+            )
+        return [[position, url] for url, position in rows]
+
+    def complete(self, url, worker_id, har_path=None):
+        """
+        Record that a URL was crawled. A result reported after the lease expired
+        is still accepted, as long as no other worker has finished the URL first.
+        """
+        with self.conn:
+            cursor = self.conn.execute(
+                """
+                UPDATE urls SET status = 'done', worker = ?, har_path = ?, error = NULL
+                WHERE url = ? AND status != 'done'
+                """,
+                (worker_id, har_path, url),
+            )
+        return cursor.rowcount == 1
+
+    def fail(self, url, worker_id, error=""):
+        """
+        Record a failed crawl. The URL goes back to the queue until it has been
+        attempted `max_attempts` times.
+        """
+        with self.conn:
+            cursor = self.conn.execute(
+                """
+                UPDATE urls
+                SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END,
+                    worker = ?, lease_expires = NULL, error = ?
+                WHERE url = ? AND status = 'leased' AND worker = ?
+                """,
+                (self.max_attempts, worker_id, error, url, worker_id),
+            )
+        return cursor.rowcount == 1
+
+    def status(self):
+        """
+        Return the number of URLs in each state.
+        """
+        counts = {"pending": 0, "leased": 0, "done": 0, "failed": 0}
+        for status, count in self.conn.execute(
+            "SELECT status, COUNT(*) FROM urls GROUP BY status"
+        ):
+            counts[status] = count
+        return counts
+
+    def is_complete(self):
+        """
+        Check whether every URL has either been crawled or given up on.
+        """
+        counts = self.status()
+        return counts["pending"] == 0 and counts["leased"] == 0
+
+    def close(self):
+        self.conn.close()
+
+
+def serve(queue, host=DEFAULT_HOST, port=DEFAULT_PORT):
+    """
+    Expose the queue to crawl workers over XML-RPC until interrupted.
+    """
+    server = SimpleXMLRPCServer((host, port), allow_none=True, logRequests=False)
+    server.register_function(queue.lease, "lease")
+    server.register_function(queue.complete, "complete")
+    server.register_function(queue.fail, "fail")
+    server.register_function(queue.status, "status")
+    server.register_function(queue.is_complete, "is_complete")
+    print(f"Coordinator listening on http://{host}:{port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Hand out crawl URLs to Create_Har_Files.py workers."
+    )
+    parser.add_argument("--db", default=DEFAULT_DB_PATH, help="SQLite queue database")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    serve_parser = subparsers.add_parser("serve", help="Run the coordinator")
+    serve_parser.add_argument("--csv", help="CSV of URLs to queue before serving")
+    serve_parser.add_argument("--start", type=int, default=0,
+                              help="Index of the first URL in the CSV to queue")
+    serve_parser.add_argument("--end", type=int, default=None,
+                              help="Index one past the last URL in the CSV to queue")
+    serve_parser.add_argument("--host", default=DEFAULT_HOST)
+    serve_parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    serve_parser.add_argument("--lease-seconds", type=float,
+                              default=DEFAULT_LEASE_SECONDS)
+    serve_parser.add_argument("--max-attempts", type=int, default=DEFAULT_MAX_ATTEMPTS)
+
+    subparsers.add_parser("status", help="Print queue progress")
+
+    args = parser.parse_args()
+
+    if args.command == "status":
+        if not os.path.exists(args.db):
+            print(f"No queue database at {args.db}.")
+            return
+        queue = LeaseQueue(args.db)
+        for status, count in queue.status().items():
+            print(f"  {status}: {count}")
+        queue.close()
+        return
+
+    queue = LeaseQueue(args.db, args.lease_seconds, args.max_attempts)
+    if args.csv:
+        urls = load_urls(args.csv)[args.start:args.end]
+        queue.add_urls(urls, start=args.start)
+        print(f"Queued {len(urls)} URLs from {args.csv}")
+    serve(queue, args.host, args.port)
+    queue.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+import cProfile
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+
+# Both can be set without touching the crawler or scanner code:
+#   CRAWL_METRICS_FILE=metrics.json  periodically write counters, rates and timers
+#   CRAWL_PROFILE=cprofile|sample    profile the whole run
+METRICS_FILE = os.environ.get("CRAWL_METRICS_FILE")
+PROFILE_MODE = os.environ.get("CRAWL_PROFILE")
+FLUSH_INTERVAL = 10  # Seconds between metrics file writes
+SAMPLE_INTERVAL = 0.005  # Seconds between stack samples for the sampling profiler
+
+
+class Metrics:
+    """
+    Thread-safe counters and timers for a long crawl or scan.
+
+    `progress_counter` names the counter that tracks finished items (pages,
+    files, ...). With `total` set, it is used to estimate the time remaining.
+    """
+
+    def __init__(self, metrics_path=None, total=None, progress_counter="items",
+                 flush_interval=FLUSH_INTERVAL):
+        self.metrics_path = metrics_path
+        self.total = total
+        self.progress_counter = progress_counter
+        self.flush_interval = flush_interval
+        self.counters = Counter()
+        self.timer_seconds = defaultdict(float)
+        self.timer_calls = Counter()
+        self.start_time = time.monotonic()
+        self.last_flush = self.start_time
+        self.lock = threading.Lock()
+
+    def increment(self, name, amount=1):
+        with self.lock:
+            self.counters[name] += amount
+
+    @contextmanager
+    def timer(self, name):
+        """
+        Add the time spent in the `with` block to the named timer.
+        """
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start_time
+            with self.lock:
+                self.timer_seconds[name] += elapsed
+                self.timer_calls[name] += 1
+
+    def snapshot(self):
+        """
+        Return the current counters, per-second rates and timer totals.
+        """
+        with self.lock:
+            elapsed = time.monotonic() - self.start_time
+            counters = dict(self.counters)
+            timers = {
+                name: {
+                    "seconds": seconds,
+                    "calls": self.timer_calls[name],
+                    "mean_ms": seconds / self.timer_calls[name] * 1000,
+                }
+                for name, seconds in self.timer_seconds.items()
+            }
+
+        rates = {
+            name: count / elapsed if elapsed else 0.0
+            for name, count in counters.items()
+        }
+        done = counters.get(self.progress_counter, 0)
+        rate = rates.get(self.progress_counter, 0.0)
+        eta = None
+        if self.total is not None and rate:
+            eta = max(self.total - done, 0) / rate
+
+        return {
+            "elapsed_seconds": elapsed,
+            "total": self.total,
+            "eta_seconds": eta,
+            "counters": counters,
+            "rates_per_second": rates,
+            "timers": timers,
+        }
+
+    def summary(self):
+        """
+        One-line progress report, e.g. for printing alongside the per-item output.
+        """
+        snapshot = self.snapshot()
+        done = snapshot["counters"].get(self.progress_counter, 0)
+        rate = snapshot["rates_per_second"].get(self.progress_counter, 0.0)
+        line = f"{done}"
+        if self.total is not None:
+            line += f"/{self.total}"
+        line += f" {self.progress_counter} ({rate:.2f}/sec)"
+        if snapshot["eta_seconds"] is not None:
+            line += f", ETA {snapshot['eta_seconds'] / 60:.1f} min"
+        timers = snapshot["timers"]
+        if timers:
+            breakdown = ", ".join(
+                f"{name} {timer['seconds']:.1f}s"
+                for name, timer in sorted(
+                    timers.items(), key=lambda x: x[1]["seconds"], reverse=True
+                )
+            )
+            line += f" | {breakdown}"
+        return line
+
+    def flush(self):
+        """
+        Write a snapshot to the metrics file, if there is one.
+        """
+        self.last_flush = time.monotonic()
+        if not self.metrics_path:
+            return
+        temp_path = f"{self.metrics_path}.tmp"
+        with open(temp_path, "w") as metrics_file:
+            json.dump(self.snapshot(), metrics_file, indent=2)
+        # Replace in one step so readers never see a half-written file
+        os.replace(temp_path, self.metrics_path)
+
+    def maybe_flush(self):
+        """
+        Flush and return True if `flush_interval` seconds have passed since the last flush.
+        """
+        if time.monotonic() - self.last_flush < self.flush_interval:
+            return False
+        self.flush()
+        return True
+
+
+class SamplingProfiler:
+    """
+    Periodically record the stack of one thread. Much cheaper than cProfile on
+    long runs; the output is in the "collapsed stack" format that flame graph
+    tools read.
+    """
+
+    def __init__(self, thread_id=None, interval=SAMPLE_INTERVAL):
+        self.thread_id = thread_id or threading.get_ident()
+        self.interval = interval
+        self.samples = Counter()
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self.stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(
+                    f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})"
+                )
+                frame = frame.f_back
+            if stack:
+                self.samples[";".join(reversed(stack))] += 1
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+        self.thread.join()
+
+    def dump(self, output_path):
+        with open(output_path, "w") as output_file:
+            for stack, count in self.samples.most_common():
+                output_file.write(f"{stack} {count}\n")
+
+
+@contextmanager
+def profiled(mode=None, output_prefix="profile"):
+    """
+    Profile the `with` block. `mode` is "cprofile" (writes <prefix>.prof, for
+    pstats or snakeviz) or "sample" (writes <prefix>.folded); None disables it.
+    """
+    if not mode:
+        yield
+        return
+
+    if mode == "cprofile":
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            profiler.dump_stats(f"{output_prefix}.prof")
+            print(f"Saved profile to {output_prefix}.prof")
+    elif mode == "sample":
+        profiler = SamplingProfiler()
+        profiler.start()
+        try:
+            yield
+        finally:
+            profiler.stop()
+            profiler.dump(f"{output_prefix}.folded")
+            print(f"Saved stack samples to {output_prefix}.folded")
+    else:
+        raise ValueError(f"Unknown profile mode: {mode}")
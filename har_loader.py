@@ -0,0 +1,314 @@
+import argparse
+import json
+import mmap
+import os
+import re
+import time
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+# Decoding backends in order of preference. orjson is used when it is installed;
+# set HAR_JSON_BACKEND=json to force the standard library decoder, or
+# HAR_JSON_BACKEND=ijson to stream only the needed fields (when ijson is installed).
+BACKENDS = [
+    backend
+    for backend, module in (("orjson", orjson), ("ijson", ijson), ("json", json))
+    if module is not None
+]
+DEFAULT_BACKEND = os.environ.get("HAR_JSON_BACKEND", BACKENDS[0])
+
+# Files smaller than this are read in one call; mapping them costs more than it saves
+MMAP_THRESHOLD = 1 << 20
+
+
+def _decode_strict(data):
+    """
+    Decode the way the scanners originally did (open(..., encoding="utf-8") and
+    json.load), so a BOM or a UTF-16/32 file is rejected rather than auto-detected.
+    """
+    return json.loads(bytes(data).decode("utf-8"))
+
+
+def slim_entries(har_data):
+    """
+    Keep only the fields the scanners look at: the request URL and the response
+    cookies. Dropping the rest lets the (often large) response bodies be freed
+    as soon as a file has been decoded.
+    """
+    entries = []
+    for entry in har_data.get("log", {}).get("entries", []):
+        entries.append(
+            {
+                "request": {"url": entry.get("request", {}).get("url", "")},
+                "response": {"cookies": entry.get("response", {}).get("cookies", [])},
+            }
+        )
+    return entries
+
+
+# orjson silently turns integers outside the 64-bit range into floats, and any
+# such float is at least this large. Only the kept fields are checked, so a
+# huge number elsewhere in the file (e.g. in a response body) costs nothing.
+WIDE_FLOAT = 2.0 ** 63
+
+
+def _has_wide_float(value):
+    if isinstance(value, float):
+        return abs(value) >= WIDE_FLOAT
+    if isinstance(value, dict):
+        return any(_has_wide_float(item) for item in value.values())
+    if isinstance(value, list):
+        return any(_has_wide_float(item) for item in value)
+    return False
+
+
+def _decode_with_orjson(har_file):
+    """
+    Decode a HAR with orjson, straight out of a memory map for large files.
+    """
+    if os.fstat(har_file.fileno()).st_size < MMAP_THRESHOLD:
+        return _decode_orjson_or_strict(har_file.read())
+    with mmap.mmap(har_file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        with memoryview(mapped) as view:
+            return _decode_orjson_or_strict(view)
+
+
+def _decode_orjson_or_strict(data):
+    try:
+        entries = slim_entries(orjson.loads(data))
+    except orjson.JSONDecodeError:
+        # orjson is stricter than the stdlib decoder (e.g. lone surrogates, NaN)
+        # and rejects a BOM, so let the original decoding path have the final
+        # say on anything it refuses
+        entries = None
+    if entries is None or _has_wide_float(entries):
+        return slim_entries(_decode_strict(data))
+    return entries
+
+
+def _decode_with_json(har_file):
+    return slim_entries(_decode_strict(har_file.read()))
+
+
+ENTRY_PREFIX = "log.entries.item"
+
+# Containers the streaming backend walks through on the way to the needed fields.
+# A different JSON type at any of them means the file is not shaped like a HAR,
+# and it is decoded the old way so the result (or error) stays the same.
+STREAMED_CONTAINERS = {
+    "": "start_map",
+    "log": "start_map",
+    "log.entries": "start_array",
+    ENTRY_PREFIX: "start_map",
+    ENTRY_PREFIX + ".request": "start_map",
+    ENTRY_PREFIX + ".response": "start_map",
+}
+STREAMED_FIELDS = {
+    ENTRY_PREFIX + ".request.url": ("request", "url"),
+    ENTRY_PREFIX + ".response.cookies": ("response", "cookies"),
+}
+
+# ijson's C backend turns a lone \uD800-\uDFFF escape into "?" where json keeps
+# the surrogate, so files with one are decoded the old way. The regex only runs
+# when a cheap substring search finds a \uD escape at all.
+LONE_SURROGATE_ESCAPE = re.compile(
+    rb"\\u[dD][89abAB][0-9a-fA-F]{2}(?!\\u[dD][c-fC-F])"
+    rb"|(?<!\\u[dD][89abAB][0-9a-fA-F]{2})\\u[dD][c-fC-F][0-9a-fA-F]{2}"
+)
+
+
+class _NotStreamable(Exception):
+    pass
+
+
+def _stream_entries(source):
+    """
+    Build the slim entries from ijson parse events. Only the request URL and the
+    response cookies are turned into Python objects; everything else, response
+    bodies included, is passed over as parse events.
+    """
+    entries = []
+    builder = None  # Builds the value of a captured container field
+    depth = 0
+    for prefix, event, value in ijson.parse(source, use_float=True):
+        if builder is not None:
+            builder.event(event, value)
+            if event in ("start_map", "start_array"):
+                depth += 1
+            elif event in ("end_map", "end_array"):
+                depth -= 1
+                if depth == 0:
+                    section, field = STREAMED_FIELDS[prefix]
+                    entries[-1][section][field] = builder.value
+                    builder = None
+            continue
+
+        if event == "map_key":
+            # ijson joins keys with ".", so a dotted key could pose as a HAR path
+            if "." in value:
+                raise _NotStreamable
+            continue
+        if event in ("end_map", "end_array"):
+            continue
+
+        expected = STREAMED_CONTAINERS.get(prefix)
+        if expected is not None:
+            if event != expected:
+                raise _NotStreamable
+            # A repeated key replaces the earlier value, as it does with json
+            if prefix in ("log", "log.entries"):
+                entries = []
+            elif prefix == ENTRY_PREFIX:
+                entries.append({"request": {"url": ""}, "response": {"cookies": []}})
+            elif prefix == ENTRY_PREFIX + ".request":
+                entries[-1]["request"]["url"] = ""
+            elif prefix == ENTRY_PREFIX + ".response":
+                entries[-1]["response"]["cookies"] = []
+            continue
+
+        field = STREAMED_FIELDS.get(prefix)
+        if field is None:
+            continue
+        if event in ("start_map", "start_array"):
+            builder = ijson.ObjectBuilder()
+            builder.event(event, value)
+            depth = 1
+        else:
+            section, name = field
+            entries[-1][section][name] = value
+    return entries
+
+
+def _decode_with_ijson(har_file):
+    """
+    Stream a HAR with ijson, extracting only the fields the scanners use. Anything
+    ijson rejects or would decode differently falls back to the original path.
+    """
+    if os.fstat(har_file.fileno()).st_size < MMAP_THRESHOLD:
+        data = har_file.read()
+        return _decode_streamed(data, data)
+    with mmap.mmap(har_file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        return _decode_streamed(mapped, mapped)
+
+
+def _has_lone_surrogate_escape(data):
+    if data.find(b"\\ud") == -1 and data.find(b"\\uD") == -1:
+        return False
+    return LONE_SURROGATE_ESCAPE.search(data) is not None
+
+
+def _decode_streamed(data, source):
+    if not _has_lone_surrogate_escape(data):
+        try:
+            return _stream_entries(source)
+        except (ijson.JSONError, UnicodeDecodeError, _NotStreamable):
+            pass
+    with memoryview(data) as view:
+        return slim_entries(_decode_strict(view))
+
+
+DECODERS = {
+    "orjson": _decode_with_orjson,
+    "ijson": _decode_with_ijson,
+    "json": _decode_with_json,
+}
+
+
+def load_har_entries(har_file_path, backend=None):
+    """
+    Load the slim entries (see slim_entries) of a HAR file using the preferred
+    available JSON backend.
+
+    Raises json.JSONDecodeError for malformed files, whichever backend is used.
+    """
+    backend = backend or DEFAULT_BACKEND
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown or unavailable JSON backend: {backend}")
+    with open(har_file_path, "rb") as har_file:
+        return DECODERS[backend](har_file)
+
+
+def _load_reference_entries(har_file_path):
+    """
+    Load a HAR the way the scanners originally did, for comparison.
+    """
+    with open(har_file_path, "r", encoding="utf-8") as har_file:
+        return slim_entries(json.load(har_file))
+
+
+def verify_backends(directory):
+    """
+    Check that every available backend gives the same entries as the original
+    json.load path for each HAR file in the directory. Returns the mismatches.
+    """
+    mismatches = []
+    for file_name in sorted(os.listdir(directory)):
+        if not file_name.endswith(".har"):
+            continue
+        har_file_path = os.path.join(directory, file_name)
+        try:
+            expected = _load_reference_entries(har_file_path)
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            expected = None
+        for backend in BACKENDS:
+            try:
+                actual = load_har_entries(har_file_path, backend)
+            except (json.JSONDecodeError, UnicodeDecodeError):
+                actual = None
+            if actual != expected:
+                mismatches.append((file_name, backend))
+    return mismatches
+
+
+def benchmark_backends(directory):
+    """
+    Time each available backend over the HAR files in the directory.
+    """
+    har_file_paths = [
+        os.path.join(directory, file_name)
+        for file_name in os.listdir(directory)
+        if file_name.endswith(".har")
+    ]
+    results = {}
+    for backend in BACKENDS:
+        start_time = time.perf_counter()
+        for har_file_path in har_file_paths:
+            try:
+                load_har_entries(har_file_path, backend)
+            except (json.JSONDecodeError, UnicodeDecodeError):
+                pass
+        elapsed = time.perf_counter() - start_time
+        results[backend] = len(har_file_paths) / elapsed if elapsed else 0.0
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Check or benchmark the HAR decoding backends."
+    )
+    parser.add_argument("directory", help="Directory containing HAR files")
+    parser.add_argument("--benchmark", action="store_true",
+                        help="Report files/sec for each backend instead of verifying")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        for backend, files_per_sec in benchmark_backends(args.directory).items():
+            print(f"  {backend}: {files_per_sec:.1f} files/sec")
+        return
+
+    mismatches = verify_backends(args.directory)
+    for file_name, backend in mismatches:
+        print(f"Mismatch in {file_name} using {backend}")
+    print(f"Checked backends {', '.join(BACKENDS)}: {len(mismatches)} mismatches")
+
+
+if __name__ == "__main__":
+    main()
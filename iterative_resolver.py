@@ -0,0 +1,392 @@
+import argparse
+import os
+import struct
+import threading
+import time
+from collections import namedtuple
+
+from Part1DNSClient import build_dns_query, measure_rtt
+
+# IPv4 root hints (https://www.internic.net/domain/named.root)
+ROOT_HINTS = [
+    "198.41.0.4",  # a.root-servers.net
+    "170.247.170.2",  # b.root-servers.net
+    "192.33.4.12",  # c.root-servers.net
+    "199.7.91.13",  # d.root-servers.net
+    "192.203.230.10",  # e.root-servers.net
+    "192.5.5.241",  # f.root-servers.net
+    "192.112.36.4",  # g.root-servers.net
+    "198.97.190.53",  # h.root-servers.net
+    "192.36.148.17",  # i.root-servers.net
+    "192.58.128.30",  # j.root-servers.net
+    "193.0.14.129",  # k.root-servers.net
+    "199.7.83.42",  # l.root-servers.net
+    "202.12.27.33",  # m.root-servers.net
+]
+
+TYPE_A = 1
+TYPE_NS = 2
+TYPE_CNAME = 5
+CLASS_IN = 1
+RCODE_NXDOMAIN = 3
+
+MAX_QUERIES = 30  # Upper bound on queries sent for a single lookup
+MAX_DEPTH = 8  # Upper bound on nested lookups (CNAME targets, glueless NS names)
+
+Record = namedtuple("Record", "name rtype ttl value")
+
+
+def read_name(data, offset):
+    """
+    Read a possibly compressed domain name. Returns the name and the offset
+    just past it in the original position.
+    """
+    labels = []
+    end = None
+    jumps = 0
+    while True:
+        length = data[offset]
+        if length & 0xC0 == 0xC0:  # Compression pointer
+            if end is None:
+                end = offset + 2
+            offset = struct.unpack(">H", data[offset:offset + 2])[0] & 0x3FFF
+            jumps += 1
+            if jumps > 32:
+                raise ValueError("compression pointer loop")
+            continue
+        offset += 1
+        if length == 0:
+            break
+        labels.append(data[offset:offset + length].decode("ascii", errors="replace"))
+        offset += length
+    return ".".join(labels).lower(), end if end is not None else offset
+
+
+def parse_dns_message(data):
+    """
+    Parse every section of a DNS response into lists of Records. A, NS and CNAME
+    data is decoded; other record types keep their raw bytes.
+    """
+    flags, qdcount, ancount, nscount, arcount = struct.unpack(">HHHHH", data[2:12])
+
+    offset = 12
+    questions = []
+    for _ in range(qdcount):
+        qname, offset = read_name(data, offset)
+        qtype, qclass = struct.unpack(">HH", data[offset:offset + 4])
+        questions.append((qname, qtype, qclass))
+        offset += 4
+
+    sections = []
+    for count in (ancount, nscount, arcount):
+        records = []
+        for _ in range(count):
+            name, offset = read_name(data, offset)
+            rtype, _, ttl, rdlength = struct.unpack(">HHIH", data[offset:offset + 10])
+            offset += 10
+            rdata = data[offset:offset + rdlength]
+            if rtype == TYPE_A and rdlength == 4:
+                value = ".".join(map(str, rdata))
+            elif rtype in (TYPE_NS, TYPE_CNAME):
+                value, _ = read_name(data, offset)
+            else:
+                value = rdata
+            records.append(Record(name, rtype, ttl, value))
+            offset += rdlength
+        sections.append(records)
+
+    answers, authority, additional = sections
+    return {
+        "id": data[:2],
+        "is_response": bool(flags & 0x8000),
+        "questions": questions,
+        "rcode": flags & 0x000F,
+        "authoritative": bool(flags & 0x0400),
+        "answers": answers,
+        "authority": authority,
+        "additional": additional,
+    }
+
+
+def is_subdomain(name, zone):
+    return zone == "" or name == zone or name.endswith("." + zone)
+
+
+class TTLCache:
+    """
+    Thread-safe dict whose entries expire after their DNS TTL.
+    """
+
+    def __init__(self):
+        self.entries = {}
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires <= time.monotonic():
+                del self.entries[key]
+                return None
+            return value
+
+    def put(self, key, value, ttl):
+        if ttl <= 0:
+            return
+        with self.lock:
+            self.entries[key] = (time.monotonic() + ttl, value)
+
+    def delete(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+
+class Lookup:
+    """
+    State for one resolve() call: the answered queries and how many were sent.
+    """
+
+    def __init__(self):
+        self.trace = []  # (zone, server, RTT in ms) for every answered query
+        self.queries_sent = 0  # Including those that timed out or were discarded
+
+
+class IterativeResolver:
+    """
+    Resolve A records without a recursive resolver: start at the root servers,
+    follow NS referrals and use glue records for the next servers' addresses.
+
+    Delegations (zone -> NS names) and nameserver addresses are cached with their
+    TTLs, so later lookups under an already-seen zone (e.g. another .com name)
+    start at that zone's servers instead of the root. Glue is only accepted for
+    names inside the zone of the server that sent it, and is kept apart from
+    answers so it is never returned as the result of a lookup.
+
+    If every server of a cached delegation fails, the delegation is dropped and
+    the lookup starts again from the closest remaining ancestor zone.
+
+    `root_hints` and `port` can point the resolver at local stub servers.
+    `server_map` maps a nameserver IP to the (host, port) actually queried, so
+    a single address (e.g. 127.0.0.1) can stand in for every server.
+    """
+
+    def __init__(self, root_hints=ROOT_HINTS, port=53, timeout=3, server_map=None):
+        self.root_hints = list(root_hints)
+        self.port = port
+        self.timeout = timeout
+        self.server_map = server_map or {}
+        self.delegations = TTLCache()  # zone -> list of NS names
+        self.addresses = TTLCache()  # host name -> IPv4 addresses from answers
+        self.glue = TTLCache()  # nameserver name -> IPv4 addresses from referrals
+
+    def resolve(self, domain_name):
+        """
+        Resolve a domain. Returns the IPs (empty if it could not be resolved) and
+        a trace of (zone, server, RTT in ms) for every query that was answered.
+        At most MAX_QUERIES queries are sent, answered or not.
+        """
+        lookup = Lookup()
+        ip_addresses = self._resolve(domain_name.lower().rstrip("."), 0, lookup)
+        return ip_addresses, lookup.trace
+
+    def _closest_servers(self, name):
+        # Walk up from the name itself to the longest cached zone with known addresses
+        labels = name.split(".")
+        for i in range(len(labels)):
+            zone = ".".join(labels[i:])
+            ns_names = self.delegations.get(zone)
+            if not ns_names:
+                continue
+            server_ips = [
+                ip for ns_name in ns_names for ip in self._nameserver_addresses(ns_name)
+            ]
+            if server_ips:
+                return zone, server_ips
+        return "", self.root_hints
+
+    def _nameserver_addresses(self, ns_name):
+        return self.glue.get(ns_name) or self.addresses.get(ns_name) or []
+
+    def _query(self, name, zone, server_ips, lookup):
+        for server_ip in server_ips:
+            if lookup.queries_sent >= MAX_QUERIES:
+                return None
+            # A fresh random ID per query, so a spoofed reply has to guess it
+            transaction_id = os.urandom(2)
+            try:
+                query = build_dns_query(name, False, transaction_id)
+            except ValueError:
+                return None  # e.g. a CNAME target that is not a valid name
+            host, port = self.server_map.get(server_ip, (server_ip, self.port))
+            lookup.queries_sent += 1
+            try:
+                data, rtt = measure_rtt(host, query, self.timeout, port)
+                response = parse_dns_message(data)
+            except (OSError, ValueError, IndexError, struct.error):
+                continue
+            if (
+                response["id"] != transaction_id
+                or not response["is_response"]
+                or response["questions"] != [(name, TYPE_A, CLASS_IN)]
+            ):
+                continue  # Not a reply to this query; never let it reach the caches
+            lookup.trace.append((zone or ".", server_ip, rtt))
+            if response["rcode"] in (0, RCODE_NXDOMAIN):
+                return response
+        return None
+
+    def _resolve(self, name, depth, lookup):
+        cached = self.addresses.get(name)
+        if cached:
+            return cached
+        if depth > MAX_DEPTH:
+            return []
+
+        zone, server_ips = self._closest_servers(name)
+        from_cache = zone != ""
+        while server_ips:
+            response = self._query(name, zone, server_ips, lookup)
+            if response is None:
+                if not zone or lookup.queries_sent >= MAX_QUERIES:
+                    return []
+                # Every server of the delegation failed. Forget it so later lookups
+                # ask the parent again, and if it came from the cache retry from the
+                # closest remaining ancestor now (a fresh referral would lead back here).
+                # Each retry removes a delegation, so this ends at the root.
+                self.delegations.delete(zone)
+                if not from_cache:
+                    return []
+                zone, server_ips = self._closest_servers(name)
+                from_cache = zone != ""
+                continue
+
+            # Follow any CNAME chain contained in the answer, trusting only records
+            # for names inside the zone the answering server was delegated
+            target = name
+            cnames = {
+                record.name: record
+                for record in response["answers"]
+                if record.rtype == TYPE_CNAME and is_subdomain(record.name, zone)
+            }
+            ttls = []
+            while target in cnames and len(ttls) <= MAX_DEPTH:
+                ttls.append(cnames[target].ttl)
+                target = cnames[target].value
+            a_records = [
+                record
+                for record in response["answers"]
+                if record.rtype == TYPE_A
+                and record.name == target
+                and is_subdomain(target, zone)
+            ]
+            if a_records:
+                ip_addresses = [record.value for record in a_records]
+                ttl = min(ttls + [record.ttl for record in a_records])
+                self.addresses.put(name, ip_addresses, ttl)
+                return ip_addresses
+            if target != name:
+                return self._resolve(target, depth + 1, lookup)
+            if response["rcode"] == RCODE_NXDOMAIN or response["authoritative"]:
+                return []
+
+            zone, server_ips = self._follow_referral(name, zone, response, depth, lookup)
+            from_cache = False
+        return []
+
+    def _follow_referral(self, name, zone, response, depth, lookup):
+        """
+        Cache the delegation and glue from a referral and return the addresses of
+        the delegated zone and its servers' addresses. The address list is empty
+        for anything that is not a referral to a zone closer to `name`.
+        """
+        ns_records = [
+            record for record in response["authority"] if record.rtype == TYPE_NS
+        ]
+        if not ns_records:
+            return zone, []
+        child_zone = ns_records[0].name
+        if (
+            child_zone == zone
+            or not is_subdomain(name, child_zone)
+            or not is_subdomain(child_zone, zone)
+        ):
+            return zone, []  # Lame or upward referral; following it could loop
+
+        ns_names = [record.value for record in ns_records if record.name == child_zone]
+        self.delegations.put(child_zone, ns_names, min(r.ttl for r in ns_records))
+
+        # Glue: addresses for the listed nameservers in the additional section.
+        # Only names inside the referring server's own zone are accepted; anything
+        # else is out of bailiwick and gets looked up separately.
+        glue = {}
+        for record in response["additional"]:
+            if (
+                record.rtype == TYPE_A
+                and record.name in ns_names
+                and is_subdomain(record.name, zone)
+            ):
+                glue.setdefault(record.name, []).append(record)
+        server_ips = []
+        for ns_name, records in glue.items():
+            ip_addresses = [record.value for record in records]
+            self.glue.put(ns_name, ip_addresses, min(r.ttl for r in records))
+            server_ips.extend(ip_addresses)
+        if server_ips:
+            return child_zone, server_ips
+
+        # No glue: look the nameservers up separately, stopping at the first that resolves
+        for ns_name in ns_names:
+            server_ips = self._nameserver_addresses(ns_name) or self._resolve(
+                ns_name, depth + 1, lookup
+            )
+            if server_ips:
+                return child_zone, server_ips
+        return child_zone, []
+
+
+def parse_server_map(entries):
+    """
+    Turn --map values of the form IP=HOST:PORT into a server_map.
+    """
+    server_map = {}
+    for entry in entries or []:
+        server_ip, _, address = entry.partition("=")
+        host, _, port = address.rpartition(":")
+        server_map[server_ip] = (host, int(port))
+    return server_map
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Resolve domains iteratively, starting from the root servers."
+    )
+    parser.add_argument("domains", nargs="+")
+    parser.add_argument("--root", action="append", dest="root_hints",
+                        help="Root server IP to start from (repeatable, e.g. a local stub)")
+    parser.add_argument("--port", type=int, default=53)
+    parser.add_argument("--timeout", type=float, default=3)
+    parser.add_argument("--map", action="append", dest="server_map",
+                        help="Send queries for a server IP elsewhere, as IP=HOST:PORT "
+                             "(repeatable, e.g. for tests/dns_stub_server.py)")
+    args = parser.parse_args()
+
+    resolver = IterativeResolver(
+        args.root_hints or ROOT_HINTS, args.port, args.timeout,
+        parse_server_map(args.server_map),
+    )
+    for domain_name in args.domains:
+        ip_addresses, trace = resolver.resolve(domain_name)
+        print(f"\n{domain_name}:")
+        for zone, server_ip, rtt in trace:
+            print(f"  {zone} via {server_ip}: {rtt:.2f} ms")
+        total_dns_rtt = sum(rtt for _, _, rtt in trace)
+        if ip_addresses:
+            print(f"  Resolved to {', '.join(ip_addresses)} in {total_dns_rtt:.2f} ms")
+        else:
+            print(f"  Failed to resolve the domain ({total_dns_rtt:.2f} ms)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+import argparse
+import json
+from collections import Counter
+
+from scan_har_files import print_report, save_scan_results
+
+
+def merge_scan_results(result_paths):
+    """
+    Combine the JSON outputs of scan_har_files.py from several machines.
+
+    A site whose HAR was scanned on more than one machine (e.g. after its crawl
+    lease expired and was reassigned) is only counted once, using the first file
+    that contains it. The global counters are rebuilt from the merged summaries.
+    """
+    third_party_requests_summary = {}
+    third_party_cookies_summary = {}
+
+    for result_path in result_paths:
+        with open(result_path, "r", encoding="utf-8") as result_file:
+            results = json.load(result_file)
+        requests = results.get("third_party_requests", {})
+        cookies = results.get("third_party_cookies", {})
+
+        for main_domain in set(requests) | set(cookies):
+            if (
+                main_domain in third_party_requests_summary
+                or main_domain in third_party_cookies_summary
+            ):
+                print(f"Skipping duplicate results for {main_domain} in {result_path}")
+                continue
+            if main_domain in requests:
+                third_party_requests_summary[main_domain] = requests[main_domain]
+            if main_domain in cookies:
+                third_party_cookies_summary[main_domain] = cookies[main_domain]
+
+    global_third_party_counter = Counter()
+    for third_party_requests in third_party_requests_summary.values():
+        global_third_party_counter.update(third_party_requests)
+
+    global_third_party_cookies_counter = Counter()
+    for third_party_cookies in third_party_cookies_summary.values():
+        global_third_party_cookies_counter.update(third_party_cookies)
+
+    return (
+        third_party_requests_summary,
+        global_third_party_counter,
+        third_party_cookies_summary,
+        global_third_party_cookies_counter,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Merge per-machine scan_har_files.py results into one report."
+    )
+    parser.add_argument("results", nargs="+", help="JSON files saved by scan_har_files.py")
+    parser.add_argument("-o", "--output", help="Path to save the merged results as JSON")
+    args = parser.parse_args()
+
+    (
+        third_party_requests_summary,
+        global_third_party_counter,
+        third_party_cookies_summary,
+        global_third_party_cookies_counter,
+    ) = merge_scan_results(args.results)
+
+    print_report(
+        third_party_requests_summary,
+        global_third_party_counter,
+        third_party_cookies_summary,
+        global_third_party_cookies_counter,
+    )
+
+    if args.output:
+        save_scan_results(
+            args.output, third_party_requests_summary, third_party_cookies_summary
+        )
+        print(f"\nSaved merged results to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
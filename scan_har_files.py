@@ -3,6 +3,9 @@ import json
 import tldextract
 from collections import defaultdict, Counter
 
+from crawl_metrics import METRICS_FILE, PROFILE_MODE, Metrics, profiled
+from har_loader import load_har_entries
+
 
 def is_third_party(request_url, main_domain):
     """
@@ -40,7 +43,7 @@ def get_main_domain_from_filename(file_name):
     return ""
 
 
-def analyze_har_files(directory):
+def analyze_har_files(directory, metrics=None):
     """
     Process all HAR files in the given directory and track third-party requests and cookies.
     """
@@ -49,44 +52,57 @@ def analyze_har_files(directory):
     global_third_party_counter = Counter()
     global_third_party_cookies_counter = Counter()
 
-    for file_name in os.listdir(directory):
-        if file_name.endswith(".har"):
-            main_domain = get_main_domain_from_filename(file_name)
-            if not main_domain:
-                print(f"Skipping file with invalid name format: {file_name}")
-                continue
-
-            har_file_path = os.path.join(directory, file_name)
-            with open(har_file_path, "r", encoding="utf-8") as har_file:
-                try:
-                    har_data = json.load(har_file)
-                    entries = har_data.get("log", {}).get("entries", [])
-
-                    for entry in entries:
-                        request_url = entry.get("request", {}).get("url", "")
-                        if request_url and is_third_party(request_url, main_domain):
-                            extracted = tldextract.extract(request_url)
-                            domain = f"{extracted.domain}.{extracted.suffix}"
-                            third_party_requests_summary[main_domain][domain] += 1
-                            global_third_party_counter[domain] += 1
-
-                        # Process response cookies
-                        response = entry.get("response", {})
-                        cookies = response.get("cookies", [])
-                        for cookie in cookies:
-                            cookie_domain = cookie.get("domain", "").lstrip(".")
-                            if cookie_domain and is_third_party_domain(
-                                cookie_domain, main_domain
-                            ):
-                                cookie_name = cookie.get("name", "")
-                                if cookie_name:
-                                    third_party_cookies_summary[main_domain][
-                                        cookie_name
-                                    ] += 1
-                                    global_third_party_cookies_counter[cookie_name] += 1
-
-                except json.JSONDecodeError:
-                    print(f"Error decoding JSON in file: {file_name}")
+    har_file_names = [
+        file_name for file_name in os.listdir(directory) if file_name.endswith(".har")
+    ]
+    if metrics is None:
+        metrics = Metrics(progress_counter="files")
+    metrics.total = len(har_file_names)
+
+    for file_name in har_file_names:
+        main_domain = get_main_domain_from_filename(file_name)
+        if not main_domain:
+            print(f"Skipping file with invalid name format: {file_name}")
+            continue
+
+        har_file_path = os.path.join(directory, file_name)
+        try:
+            with metrics.timer("parse"):
+                entries = load_har_entries(har_file_path)
+
+            with metrics.timer("classify"):
+                for entry in entries:
+                    request_url = entry.get("request", {}).get("url", "")
+                    if request_url and is_third_party(request_url, main_domain):
+                        extracted = tldextract.extract(request_url)
+                        domain = f"{extracted.domain}.{extracted.suffix}"
+                        third_party_requests_summary[main_domain][domain] += 1
+                        global_third_party_counter[domain] += 1
+
+                    # Process response cookies
+                    response = entry.get("response", {})
+                    cookies = response.get("cookies", [])
+                    for cookie in cookies:
+                        cookie_domain = cookie.get("domain", "").lstrip(".")
+                        if cookie_domain and is_third_party_domain(
+                            cookie_domain, main_domain
+                        ):
+                            cookie_name = cookie.get("name", "")
+                            if cookie_name:
+                                third_party_cookies_summary[main_domain][
+                                    cookie_name
+                                ] += 1
+                                global_third_party_cookies_counter[cookie_name] += 1
+            metrics.increment("entries", len(entries))
+
+        except json.JSONDecodeError:
+            print(f"Error decoding JSON in file: {file_name}")
+            metrics.increment("errors")
+
+        metrics.increment("files")
+        metrics.increment("har_bytes", os.path.getsize(har_file_path))
+        if metrics.maybe_flush():
+            print(f"Progress: {metrics.summary()}")
 
     return (
         third_party_requests_summary,
@@ -96,24 +112,34 @@ def analyze_har_files(directory):
     )
 
 
-def main():
-    # Directory containing HAR files
-    har_directory = input(
-        "Enter the path to the directory containing HAR files: "
-    ).strip()
-
-    if not os.path.isdir(har_directory):
-        print("The provided path is not a valid directory.")
-        return
-
-    # Analyze HAR files
-    (
-        third_party_requests_summary,
-        global_third_party_counter,
-        third_party_cookies_summary,
-        global_third_party_cookies_counter,
-    ) = analyze_har_files(har_directory)
-
+def save_scan_results(
+    output_path,
+    third_party_requests_summary,
+    third_party_cookies_summary,
+):
+    """
+    Save the per-domain summaries as JSON so scans from several machines can be
+    combined with merge_scan_results.py.
+    """
+    with open(output_path, "w", encoding="utf-8") as output_file:
+        json.dump(
+            {
+                "third_party_requests": third_party_requests_summary,
+                "third_party_cookies": third_party_cookies_summary,
+            },
+            output_file,
+        )
+
+
+def print_report(
+    third_party_requests_summary,
+    global_third_party_counter,
+    third_party_cookies_summary,
+    global_third_party_cookies_counter,
+):
+    """
+    Print the per-domain results followed by the top 10 third-party domains and cookies.
+    """
     # Output results for each main domain
     for main_domain in sorted(third_party_requests_summary.keys()):
         print(f"\nThird-party requests for {main_domain}:")
@@ -145,5 +171,46 @@ def main():
         print(f"  {cookie}: {count} occurrences")
 
 
+def main():
+    # Directory containing HAR files
+    har_directory = input(
+        "Enter the path to the directory containing HAR files: "
+    ).strip()
+
+    if not os.path.isdir(har_directory):
+        print("The provided path is not a valid directory.")
+        return
+
+    # Optional JSON output for merging with scans from other machines
+    output_path = input(
+        "Enter a path to save the results as JSON (leave blank to skip): "
+    ).strip()
+
+    # Analyze HAR files
+    metrics = Metrics(METRICS_FILE, progress_counter="files")
+    with profiled(PROFILE_MODE, "scan_profile"):
+        (
+            third_party_requests_summary,
+            global_third_party_counter,
+            third_party_cookies_summary,
+            global_third_party_cookies_counter,
+        ) = analyze_har_files(har_directory, metrics)
+    metrics.flush()
+    print(f"Scanned {metrics.summary()}")
+
+    print_report(
+        third_party_requests_summary,
+        global_third_party_counter,
+        third_party_cookies_summary,
+        global_third_party_cookies_counter,
+    )
+
+    if output_path:
+        save_scan_results(
+            output_path, third_party_requests_summary, third_party_cookies_summary
+        )
+        print(f"\nSaved results to {output_path}")
+
+
 if __name__ == "__main__":
     main()
@@ -1,10 +1,13 @@
 import os
-import json
 import tldextract
 from collections import defaultdict, Counter
 from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 import logging
 
+from crawl_metrics import METRICS_FILE, Metrics
+from har_loader import load_har_entries
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
@@ -24,16 +27,19 @@ def is_third_party(request_url, main_domain):
     )
 
 
-def analyze_single_har(file_path):
-    """Analyze a single HAR file."""
+def analyze_single_har(file_path, metrics=None):
+    """Analyze a single HAR file, recording timings in a (shared) Metrics."""
+    if metrics is None:
+        metrics = Metrics(progress_counter="files")
     try:
-        with open(file_path, "r", encoding="utf-8") as har_file:
-            har_data = json.load(har_file)
-            main_domain = os.path.basename(file_path).rsplit(".har", 1)[0]
-            third_party_requests = defaultdict(int)
-            third_party_cookies = defaultdict(int)
-
-            for entry in har_data.get("log", {}).get("entries", []):
+        with metrics.timer("parse"):
+            entries = load_har_entries(file_path)
+        main_domain = os.path.basename(file_path).rsplit(".har", 1)[0]
+        third_party_requests = defaultdict(int)
+        third_party_cookies = defaultdict(int)
+
+        with metrics.timer("classify"):
+            for entry in entries:
                 request_url = entry.get("request", {}).get("url", "")
                 if request_url and is_third_party(request_url, main_domain):
                     domain = tldextract.extract(request_url).fqdn
@@ -43,11 +49,18 @@ def analyze_single_har(file_path):
                     cookie_domain = cookie.get("domain", "").lstrip(".")
                     if is_third_party(cookie_domain, main_domain):
                         third_party_cookies[cookie.get("name", "")] += 1
+        metrics.increment("entries", len(entries))
 
-            return main_domain, third_party_requests, third_party_cookies
+        return main_domain, third_party_requests, third_party_cookies
     except Exception as e:
         logging.error(f"Error processing file {file_path}: {e}")
+        metrics.increment("errors")
         return None, None, None
+    finally:
+        metrics.increment("files")
+        metrics.increment("har_bytes", os.path.getsize(file_path))
+        if metrics.maybe_flush():
+            logging.info(f"Progress: {metrics.summary()}")
 
 
 def main():
@@ -59,10 +72,13 @@ def main():
     ]
 
     # Process files in parallel
+    metrics = Metrics(METRICS_FILE, total=len(har_files), progress_counter="files")
     third_party_counter = Counter()
     third_party_cookie_counter = Counter()
     with ThreadPoolExecutor(max_workers=CONFIG["max_workers"]) as executor:
-        results = executor.map(analyze_single_har, har_files)
+        results = executor.map(partial(analyze_single_har, metrics=metrics), har_files)
+    metrics.flush()
+    logging.info(f"Scanned {metrics.summary()}")
 
     for main_domain, requests, cookies in results:
         if main_domain:
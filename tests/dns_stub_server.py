@@ -0,0 +1,258 @@
+"""
+Stub authoritative DNS servers for exercising iterative_resolver.py offline.
+
+Every logical server (root, com, example.com, ...) gets its own UDP port on one
+local address, so the whole hierarchy runs on 127.0.0.1 alone (the only loopback
+address macOS configures). The resolver is pointed at them with server_map, or
+--map on the command line, which maps each server's made-up IP to its port.
+
+Run `python tests/dns_stub_server.py` to start the test hierarchy and print the
+iterative_resolver.py command that uses it.
+"""
+import os
+import socket
+import struct
+import sys
+import threading
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Part1DNSClient import encode_domain_name  # noqa: E402
+from iterative_resolver import (  # noqa: E402
+    CLASS_IN,
+    RCODE_NXDOMAIN,
+    TYPE_A,
+    TYPE_CNAME,
+    TYPE_NS,
+    is_subdomain,
+    read_name,
+)
+
+TTL = 300
+
+# What a server does with a query
+ANSWER = "answer"
+DROP = "drop"  # Never reply, as if the server were down
+WRONG_ID = "wrong_id"  # Reply with a different transaction ID
+
+
+def encode_record(name, rtype, value, ttl=TTL):
+    if rtype == TYPE_A:
+        rdata = socket.inet_aton(value)
+    else:
+        rdata = encode_domain_name(value) if value else b"\x00"
+    owner = encode_domain_name(name) if name else b"\x00"
+    return owner + struct.pack(">HHIH", rtype, CLASS_IN, ttl, len(rdata)) + rdata
+
+
+class StubServer:
+    """
+    An authoritative server for one or more zones. `zones` maps a zone name to
+    its records as (name, type, value) tuples: A and CNAME data, NS records that
+    delegate child zones, and A records for those nameservers (sent as glue).
+    `extra_additional` records are appended to every referral, e.g. to send
+    glue that is out of bailiwick.
+    """
+
+    def __init__(self, ip, zones, mode=ANSWER, extra_additional=(), host="127.0.0.1"):
+        self.ip = ip
+        self.zones = zones
+        self.mode = mode
+        self.extra_additional = list(extra_additional)
+        self.queries = Counter()  # Query name -> number received
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind((host, 0))
+        self.sock.settimeout(0.1)
+        self.address = self.sock.getsockname()
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+        self.thread.join()
+        self.sock.close()
+
+    def _run(self):
+        while not self.stopped.is_set():
+            try:
+                data, client = self.sock.recvfrom(512)
+            except socket.timeout:
+                continue
+            qname, _ = read_name(data, 12)
+            self.queries[qname] += 1
+            if self.mode == DROP:
+                continue
+            response = self.respond(data, qname)
+            if self.mode == WRONG_ID:
+                response = bytes([data[0] ^ 0xFF, data[1]]) + response[2:]
+            self.sock.sendto(response, client)
+
+    def respond(self, query, qname):
+        zone = max(
+            (zone for zone in self.zones if is_subdomain(qname, zone)),
+            key=len,
+            default=None,
+        )
+        if zone is None:
+            return self._message(query, 5, False, [], [], [])  # REFUSED
+        records = self.zones[zone]
+
+        # Referral to the closest child zone containing the name
+        delegated = [
+            record_name
+            for record_name, rtype, _ in records
+            if rtype == TYPE_NS and record_name != zone and is_subdomain(qname, record_name)
+        ]
+        if delegated:
+            child_zone = max(delegated, key=len)
+            authority = [r for r in records if r[0] == child_zone and r[1] == TYPE_NS]
+            ns_names = {value for _, _, value in authority}
+            additional = [r for r in records if r[1] == TYPE_A and r[0] in ns_names]
+            return self._message(
+                query, 0, False, [], authority, additional + self.extra_additional
+            )
+
+        # Answer, following CNAMEs within the zone
+        answers = []
+        name = qname
+        while True:
+            matches = [r for r in records if r[0] == name and r[1] in (TYPE_A, TYPE_CNAME)]
+            answers.extend(matches)
+            cnames = [value for _, rtype, value in matches if rtype == TYPE_CNAME]
+            if not cnames or not is_subdomain(cnames[0], zone):
+                break
+            name = cnames[0]
+        if answers:
+            return self._message(query, 0, True, answers, [], [])
+        exists = any(record_name == qname for record_name, _, _ in records)
+        return self._message(query, 0 if exists else RCODE_NXDOMAIN, True, [], [], [])
+
+    def _message(self, query, rcode, authoritative, answers, authority, additional):
+        question_end = query.index(b"\x00", 12) + 5
+        flags = 0x8000 | (0x0400 if authoritative else 0) | rcode
+        header = query[:2] + struct.pack(
+            ">HHHHH", flags, 1, len(answers), len(authority), len(additional)
+        )
+        body = b"".join(
+            encode_record(*record) for record in answers + authority + additional
+        )
+        return header + query[12:question_end] + body
+
+
+class StubNetwork:
+    """
+    A set of StubServers, all on one local address.
+    """
+
+    def __init__(self, servers):
+        self.servers = {server.ip: server for server in servers}
+
+    @property
+    def server_map(self):
+        return {ip: server.address for ip, server in self.servers.items()}
+
+    def queries(self, ip):
+        return sum(self.servers[ip].queries.values())
+
+    def start(self):
+        for server in self.servers.values():
+            server.start()
+        return self
+
+    def stop(self):
+        # Signal every server first so their shutdown waits overlap
+        for server in self.servers.values():
+            server.stopped.set()
+        for server in self.servers.values():
+            server.stop()
+
+
+# Made-up server addresses from TEST-NET-1; they are never contacted directly
+ROOT = "192.0.2.1"
+COM = "192.0.2.2"
+ORG = "192.0.2.3"
+EXAMPLE = "192.0.2.4"
+GLUELESS = "192.0.2.5"
+SPOOFER = "192.0.2.7"
+DEAD = "192.0.2.9"
+RENUMBERED = "192.0.2.10"
+POISON = "192.0.2.66"
+
+
+def build_test_network():
+    """
+    root -> com, org.
+    com: example.com (with glue), glueless.com (NS ns.glueless.org, no glue),
+         poisoned.com (same NS, plus out-of-bailiwick glue pointing at POISON),
+         spoofed.com (first server answers with the wrong ID),
+         down.com (every server dead).
+    """
+    example_zone = [
+        ("www.example.com", TYPE_A, "198.51.100.1"),
+        ("alias.example.com", TYPE_CNAME, "www.example.com"),
+        ("mail.example.com", TYPE_A, "198.51.100.2"),
+        ("out.example.com", TYPE_CNAME, "www.glueless.com"),
+    ]
+    servers = [
+        StubServer(ROOT, {"": [
+            ("com", TYPE_NS, "a.nic.com"),
+            ("a.nic.com", TYPE_A, COM),
+            ("org", TYPE_NS, "a.nic.org"),
+            ("a.nic.org", TYPE_A, ORG),
+        ]}),
+        StubServer(COM, {"com": [
+            ("example.com", TYPE_NS, "ns1.example.com"),
+            ("ns1.example.com", TYPE_A, EXAMPLE),
+            ("glueless.com", TYPE_NS, "ns.glueless.org"),
+            ("poisoned.com", TYPE_NS, "ns.glueless.org"),
+            ("spoofed.com", TYPE_NS, "ns1.spoofed.com"),
+            ("spoofed.com", TYPE_NS, "ns2.spoofed.com"),
+            ("ns1.spoofed.com", TYPE_A, SPOOFER),
+            ("ns2.spoofed.com", TYPE_A, EXAMPLE),
+            ("down.com", TYPE_NS, "ns1.down.com"),
+            ("down.com", TYPE_NS, "ns2.down.com"),
+            ("ns1.down.com", TYPE_A, DEAD),
+            ("ns2.down.com", TYPE_A, DEAD),
+        ]}, extra_additional=[("ns.glueless.org", TYPE_A, POISON)]),
+        StubServer(ORG, {"org": [("ns.glueless.org", TYPE_A, GLUELESS)]}),
+        StubServer(EXAMPLE, {
+            "example.com": example_zone,
+            "spoofed.com": [("www.spoofed.com", TYPE_A, "198.51.100.7")],
+        }),
+        StubServer(GLUELESS, {
+            "glueless.com": [("www.glueless.com", TYPE_A, "198.51.100.5")],
+            "poisoned.com": [("www.poisoned.com", TYPE_A, "198.51.100.6")],
+        }),
+        StubServer(SPOOFER, {"spoofed.com": [("www.spoofed.com", TYPE_A, "203.0.113.7")]},
+                   mode=WRONG_ID),
+        StubServer(DEAD, {}, mode=DROP),
+        StubServer(RENUMBERED, {"example.com": example_zone}),
+        StubServer(POISON, {
+            "glueless.com": [("www.glueless.com", TYPE_A, "203.0.113.66")],
+            "poisoned.com": [("www.poisoned.com", TYPE_A, "203.0.113.66")],
+        }),
+    ]
+    return StubNetwork(servers)
+
+
+def main():
+    network = build_test_network().start()
+    map_args = " ".join(
+        f"--map {ip}={host}:{port}" for ip, (host, port) in network.server_map.items()
+    )
+    print("Stub servers running. Try:")
+    print(f"  python iterative_resolver.py --root {ROOT} {map_args} --timeout 1 "
+          "www.example.com alias.example.com out.example.com www.glueless.com "
+          "www.poisoned.com www.spoofed.com nope.example.com www.down.com")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        network.stop()
+
+
+if __name__ == "__main__":
+    main()
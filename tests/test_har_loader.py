@@ -0,0 +1,85 @@
+"""
+Differential check for har_loader: every available backend must give the same
+entries, or raise the same error, as the original open(..., encoding="utf-8")
++ json.load path the scanners used.
+
+Run with `python -m pytest tests` or `python tests/test_har_loader.py`.
+"""
+import json
+import os
+import shutil
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import har_loader  # noqa: E402
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "har_fixtures")
+
+# Generated at test time so the repo does not carry multi-megabyte fixtures:
+# name -> (fixture it is built from, prefix bytes)
+LARGE_FIXTURES = {
+    "large.com.har": ("basic.com.har", b""),
+    "large-bom.com.har": ("basic.com.har", b"\xef\xbb\xbf"),
+    "large-lone-surrogate.com.har": ("lone-surrogate.com.har", b""),
+}
+
+FIXTURE_NAMES = sorted(
+    name for name in os.listdir(FIXTURE_DIR) if name.endswith(".har")
+) + sorted(LARGE_FIXTURES)
+
+
+def _write_large_fixture(path, source_name, prefix):
+    """
+    Repeat the entries of a small fixture until the file is over MMAP_THRESHOLD.
+    """
+    with open(os.path.join(FIXTURE_DIR, source_name), encoding="utf-8") as source:
+        text = source.read()
+    head, opening, entries = text.partition('"entries": [')
+    body, _, rest = entries.rpartition("]")
+    repeats = har_loader.MMAP_THRESHOLD // len(body) + 1
+    with open(path, "wb") as har_file:
+        har_file.write(prefix)
+        har_file.write((head + opening).encode("utf-8"))
+        har_file.write(", ".join([body] * repeats).encode("utf-8"))
+        har_file.write(("]" + rest).encode("utf-8"))
+
+
+@pytest.fixture(scope="module")
+def har_dir(tmp_path_factory):
+    directory = tmp_path_factory.mktemp("har_fixtures")
+    for name in os.listdir(FIXTURE_DIR):
+        shutil.copy(os.path.join(FIXTURE_DIR, name), directory / name)
+    for name, (source_name, prefix) in LARGE_FIXTURES.items():
+        _write_large_fixture(directory / name, source_name, prefix)
+        assert os.path.getsize(directory / name) > har_loader.MMAP_THRESHOLD
+    return directory
+
+
+def _outcome(load, path):
+    try:
+        return "entries", load(path)
+    except Exception as e:
+        return "error", type(e).__name__
+
+
+@pytest.mark.parametrize("backend", har_loader.BACKENDS)
+@pytest.mark.parametrize("name", FIXTURE_NAMES)
+def test_backend_matches_original_path(har_dir, backend, name):
+    path = os.path.join(har_dir, name)
+    expected = _outcome(har_loader._load_reference_entries, path)
+    actual = _outcome(lambda p: har_loader.load_har_entries(p, backend), path)
+    assert actual == expected
+
+
+def test_large_fixture_keeps_every_entry(har_dir):
+    entries = har_loader.load_har_entries(os.path.join(har_dir, "large.com.har"))
+    with open(os.path.join(FIXTURE_DIR, "basic.com.har"), encoding="utf-8") as har_file:
+        per_copy = len(json.load(har_file)["log"]["entries"])
+    assert entries and len(entries) % per_copy == 0
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,135 @@
+"""
+Exercise IterativeResolver against the stub servers in dns_stub_server.py:
+glue, glueless NS, CNAMEs, NXDOMAIN, cache reuse, out-of-bailiwick glue,
+spoofed replies, dead delegations and the per-lookup query cap.
+
+Run with `python -m pytest tests` or `python tests/test_iterative_resolver.py`.
+"""
+import os
+import sys
+
+import pytest
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(TESTS_DIR))
+sys.path.insert(0, TESTS_DIR)
+
+import dns_stub_server as stub  # noqa: E402
+import batch_dns_measure  # noqa: E402
+import iterative_resolver  # noqa: E402
+from iterative_resolver import IterativeResolver  # noqa: E402
+
+TIMEOUT = 0.2  # Seconds to wait for the stub servers that never reply
+
+
+@pytest.fixture
+def network():
+    network = stub.build_test_network().start()
+    yield network
+    network.stop()
+
+
+@pytest.fixture
+def resolver(network):
+    return IterativeResolver([stub.ROOT], timeout=TIMEOUT, server_map=network.server_map)
+
+
+def _zones(trace):
+    return [zone for zone, _, _ in trace]
+
+
+def test_glue(resolver):
+    ip_addresses, trace = resolver.resolve("www.example.com")
+    assert ip_addresses == ["198.51.100.1"]
+    assert _zones(trace) == [".", "com", "example.com"]
+    assert trace[-1][1] == stub.EXAMPLE
+
+
+def test_glueless_nameserver(resolver):
+    ip_addresses, trace = resolver.resolve("www.glueless.com")
+    assert ip_addresses == ["198.51.100.5"]
+    # ns.glueless.org is looked up from the root before glueless.com is asked
+    assert _zones(trace) == [".", "com", ".", "org", "glueless.com"]
+
+
+def test_cname_in_zone_and_out_of_zone(resolver):
+    assert resolver.resolve("alias.example.com")[0] == ["198.51.100.1"]
+    ip_addresses, trace = resolver.resolve("out.example.com")
+    assert ip_addresses == ["198.51.100.5"]
+    assert _zones(trace)[-1] == "glueless.com"
+
+
+def test_nxdomain(resolver, network):
+    ip_addresses, trace = resolver.resolve("nope.example.com")
+    assert ip_addresses == []
+    assert _zones(trace) == [".", "com", "example.com"]
+    assert network.servers[stub.EXAMPLE].queries["nope.example.com"] == 1
+
+
+def test_cache_reuse(resolver, network):
+    resolver.resolve("www.example.com")
+    root_queries = network.queries(stub.ROOT)
+    com_queries = network.queries(stub.COM)
+
+    ip_addresses, trace = resolver.resolve("mail.example.com")
+    assert ip_addresses == ["198.51.100.2"]
+    assert _zones(trace) == ["example.com"]
+    assert resolver.resolve("www.example.com") == (["198.51.100.1"], [])
+    assert network.queries(stub.ROOT) == root_queries
+    assert network.queries(stub.COM) == com_queries
+
+
+def test_cached_answer_is_reported_in_batch_rows(resolver):
+    batch_dns_measure.resolve_iteratively("www.example.com", resolver)
+    result = batch_dns_measure.resolve_iteratively("www.example.com", resolver)
+    assert result["resolver"] == "cached"
+    assert result["dns_rtt_ms"] == "0.00"
+    assert result["ips"] == "198.51.100.1"
+
+
+def test_out_of_bailiwick_glue_is_ignored(resolver, network):
+    assert resolver.resolve("www.poisoned.com")[0] == ["198.51.100.6"]
+    assert network.queries(stub.POISON) == 0
+    assert resolver.glue.get("ns.glueless.org") is None
+
+
+def test_reply_with_wrong_id_is_discarded(resolver, network):
+    ip_addresses, trace = resolver.resolve("www.spoofed.com")
+    assert ip_addresses == ["198.51.100.7"]
+    assert network.queries(stub.SPOOFER) == 1
+    assert stub.SPOOFER not in [server for _, server, _ in trace]
+
+
+def test_dead_cached_delegation_retries_from_parent(resolver, network):
+    resolver.resolve("www.example.com")
+    # example.com moves to a new server and the old one goes down
+    com_records = network.servers[stub.COM].zones["com"]
+    com_records.remove(("ns1.example.com", iterative_resolver.TYPE_A, stub.EXAMPLE))
+    com_records.append(("ns1.example.com", iterative_resolver.TYPE_A, stub.RENUMBERED))
+    network.servers[stub.EXAMPLE].mode = stub.DROP
+
+    ip_addresses, trace = resolver.resolve("mail.example.com")
+    assert ip_addresses == ["198.51.100.2"]
+    assert _zones(trace) == ["com", "example.com"]
+    assert trace[-1][1] == stub.RENUMBERED
+
+
+def test_dead_delegation_is_dropped(resolver, network):
+    ip_addresses, trace = resolver.resolve("www.down.com")
+    assert ip_addresses == []
+    assert _zones(trace) == [".", "com"]
+    assert network.queries(stub.DEAD) == 2  # Both nameservers were tried
+    assert resolver.delegations.get("down.com") is None
+
+
+def test_query_cap_counts_unanswered_queries(resolver, network, monkeypatch):
+    monkeypatch.setattr(iterative_resolver, "MAX_QUERIES", 3)
+    ip_addresses, trace = resolver.resolve("www.down.com")
+    assert ip_addresses == []
+    assert len(trace) == 2
+    # The third query (to a dead server) is the last one sent
+    assert network.queries(stub.DEAD) == 1
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))